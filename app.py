@@ -2,29 +2,49 @@
 # ------------------------------------------------------------------
 # After the final scene (Scene 3) we automatically generate a DALL·E-3
 # poster summarising the whole story, and you can listen to any scene
-# via OpenAI TTS (streaming, synchronous – no asyncio required).
+# via OpenAI TTS. The end-of-story calls (poster, judge, narration) run
+# concurrently on the async client.
 # ------------------------------------------------------------------
 
 from __future__ import annotations
 
+import asyncio
+import atexit
+import functools
+import itertools
+import json
+import logging
 import os
+import shutil
 import re
-import textwrap
 import tempfile
+import uuid
+from collections import OrderedDict
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, List
 import base64
 import hashlib
 
-import openai
 import gradio as gr
-from openai import OpenAI, OpenAIError
+from openai import (
+    AsyncOpenAI, DefaultAsyncHttpxClient, OpenAIError,
+)
+
+from cache import SemanticCache
+
+log = logging.getLogger(__name__)
 
 # ---------- CONFIG ---------------------------------------------------------
-openai.api_key = os.getenv("OPENAI_API_KEY")
-MODEL = "gpt-4o-mini"
+MODEL = os.getenv("STORY_MODEL", "gpt-4o-mini")  # e.g. gpt-3.5-turbo-0125 to A/B speed
 TTS_MODEL = "tts-1"              # correct OpenAI TTS model
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIMS = 256                 # plenty for matching short story ideas
 TEMPERATURE = 0.4
+SCENE_MAX_TOKENS = 260           # ≈150 words + emojis + two choices
+SCENE_RETRY_MAX_TOKENS = 450     # rare re-run when a scene hits the cap
+SCENE_STOP = ["\nSCENE ", "The End."]  # app adds its own ending banner
+OPENAI_CONCURRENCY = 16          # in-flight API calls across all sessions
+QUEUE_MAX_SIZE = 128             # waiting Gradio events before "queue full"
 
 # Voice options for narration
 VOICE_OPTIONS = {
@@ -55,14 +75,21 @@ CATEGORIES = [
 ]
 DEFAULT_CATEGORY = CATEGORIES[0]
 
-# ---------- PROMPT TEMPLATES ----------------------------------------------
-SCENE_TEMPLATE = '''
-You are a children's storyteller. Write **SCENE {scene_no}/3** of an
-age-5-to-10 bedtime story (≈ 150 words).
+# Text patterns, compiled once at import
+_TTS_DEL = str.maketrans("", "", "*_`#🌟")     # markdown + sparkle, stripped for TTS
+_STAR_RE = re.compile(r"[*_`]+")              # emphasis around option text
+_OPT_RE = re.compile(r"^\s*[12]\.")            # "1." / "2." choice lines
+_END_RE = re.compile(r"^\s*(The\s+end\.?)(\s*)$", re.I | re.M)
+_TOK_RE = re.compile(r"\b[A-Za-z']{4,}\b")    # learn-something tokens
 
-**Category:** {category}
-**Child's idea:** "{idea}"
-👉 *Work the idea into the first two sentences.*
+# ---------- PROMPT TEMPLATES ----------------------------------------------
+# Static rules go first as the system message (the same for every request),
+# then the story's idea (fixed per story), then the per-scene tail. The rules
+# are far below the 1024-token minimum for OpenAI's prompt caching; this order
+# just keeps the fixed parts separate from what changes per call.
+SCENE_SYSTEM = '''
+You are a children's storyteller writing a three-scene, age-5-to-10
+bedtime story (≈ 150 words per scene).
 
 ### Story-Arc Requirements
 - **Scene 1** – introduce the main character and their WANT/PROBLEM.
@@ -73,17 +100,35 @@ age-5-to-10 bedtime story (≈ 150 words).
 1. Use vivid language and **relevant emojis** (😀🐉🍪🌟🚀 …).
 2. Keep sentences short and clear.
 3. Leave a blank line between paragraphs.
-4. **Scenes 1 & 2:** end with *exactly two* **bold** numbered choices ("1." & "2.").
+4. **Scenes 1 & 2:** end with *exactly two* **bold** numbered choices ("1." & "2."), then stop.
 5. **Scene 3:** wrap up the tale (no choices). Do **not** write "The end." before Scene 3.
 6. Each scene should clearly advance the arc.
+'''
 
+SCENE_PREAMBLE = '''
+**Category:** {category}
+**Child's idea:** "{idea}"
+👉 *Work the idea into the first two sentences.*
+'''
+
+SCENE_SUFFIX = '''
 Story so far:
 """{story_so_far}"""
 
+Now write **SCENE {scene_no}/3**.
 `last_choice` = "{last_choice}"
 If `last_choice` == "N/A" this is the opening scene, otherwise nod to the child's choice in one friendly sentence before continuing.
 '''
 
+BRANCHES_SUFFIX = '''
+The child has not chosen yet, so write this scene TWICE – once for each
+possible `last_choice` below – and return JSON with both versions:
+{{"choice1": "<scene if the child picks choice 1>", "choice2": "<scene if the child picks choice 2>"}}
+
+choice1 = "{opt1}"
+choice2 = "{opt2}"
+'''
+
 REVISION_TEMPLATE = '''
 You previously wrote SCENE {scene_no}/3 …
 
@@ -97,66 +142,204 @@ Original scene:
 
 # ---------- LLM CORE -------------------------------------------------------
 
-def _chat(prompt: str) -> str:
-    resp = openai.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=TEMPERATURE,
-        max_tokens=600,
-    )
-    return resp.choices[0].message.content.strip()
+# One pooled async client for chat, TTS and images alike. HTTP/2 (when
+# the optional `h2` package is installed) multiplexes concurrent sessions
+# over a single TLS connection instead of opening one per request. The SDK's
+# DefaultAsyncHttpxClient keeps its own pool limits and timeouts.
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+_aclient = AsyncOpenAI(  # uses OPENAI_API_KEY
+    http_client=DefaultAsyncHttpxClient(http2=_HTTP2)
+)
+_api_sem: asyncio.Semaphore | None = None   # created lazily on Gradio's loop
+_warmed = False
 
-# ---------- TTS (TEXT-TO-SPEECH) ------------------------------------------
 
-_client = OpenAI()                       # uses OPENAI_API_KEY env-var
-_audio_cache: dict[str, str] = {}        # md5(clean_text) ➜ data-URL
+def _api_slot() -> asyncio.Semaphore:
+    """Shared cap on concurrent OpenAI calls, so bursts queue here, not as 429s."""
+    global _api_sem
+    if _api_sem is None:
+        _api_sem = asyncio.Semaphore(OPENAI_CONCURRENCY)
+    return _api_sem
+
+
+async def _warm_up() -> None:
+    """Open the pooled connection (DNS + TLS) before the first story is asked for."""
+    global _warmed
+    if _warmed:
+        return
+    _warmed = True
+    try:
+        await _aclient.with_options(timeout=3.0, max_retries=0).models.retrieve(MODEL)
+    except OpenAIError:
+        pass  # best effort – the first real request just pays the handshake
+
+
+_SYSTEM_MSG = {"role": "system", "content": SCENE_SYSTEM}
+
+
+async def _chat(prompt: str) -> AsyncIterator[str]:
+    """Stream the completion, yielding the text received so far after each token.
+
+    Scenes get a tight token cap; if one is cut off mid-way it is re-streamed
+    once with a larger cap (the view simply restarts from the new text).
+    """
+    for cap in (SCENE_MAX_TOKENS, SCENE_RETRY_MAX_TOKENS):
+        async with _api_slot():
+            stream = await _aclient.chat.completions.create(
+                model=MODEL,
+                messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
+                temperature=TEMPERATURE,
+                max_tokens=cap,
+                stop=SCENE_STOP,
+                stream=True,
+            )
+            text, finish_reason = "", None
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    text += choice.delta.content
+                    yield text
+                finish_reason = choice.finish_reason or finish_reason
+        if finish_reason != "length":
+            return
+        log.warning("Scene hit max_tokens=%d, retrying", cap)
+
+
+async def _chat_json(prompt: str, max_tokens: int = 2 * SCENE_MAX_TOKENS + 200) -> dict:
+    """Like `_chat`, but for prompts that ask for several results as one JSON object."""
+    async with _api_slot():
+        resp = await _aclient.chat.completions.create(
+            model=MODEL,
+            messages=[_SYSTEM_MSG, {"role": "user", "content": prompt}],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+        )
+    return json.loads(resp.choices[0].message.content)
+
+
+async def _embed(text: str) -> list[float] | None:
+    """Embedding for semantic-cache lookups; ``None`` if the call fails."""
+    try:
+        async with _api_slot():
+            resp = await _aclient.embeddings.create(
+                model=EMBED_MODEL, input=text, dimensions=EMBED_DIMS
+            )
+    except OpenAIError as e:
+        log.warning("Embedding failed: %s", e)
+        return None
+    return resp.data[0].embedding
+
+# ---------- DISK CACHE -----------------------------------------------------
+# Results are keyed by a hash of everything that shapes them (model, voice,
+# speed, text), so repeat requests skip the API – even across restarts.
+
+# Scratch files are written to _TMPDIR, then renamed into place. It lives
+# inside the cache (same filesystem, so os.replace stays atomic) and is
+# removed on exit together with any half-written downloads. An unwritable
+# cache dir (read-only HOME) falls back to the system temp dir.
+_CACHE_DIR = Path(os.getenv("BEDTIME_CACHE_DIR", "~/.cache/bedtime")).expanduser()
+try:
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _TMPDIR = Path(tempfile.mkdtemp(prefix="tmp_", dir=_CACHE_DIR))
+except OSError as e:
+    log.warning("Cache dir %s unusable (%s), using the temp dir", _CACHE_DIR, e)
+    _CACHE_DIR = Path(tempfile.gettempdir()) / "bedtime"
+    _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _TMPDIR = Path(tempfile.mkdtemp(prefix="tmp_", dir=_CACHE_DIR))
+_TMPCTR = itertools.count()
+atexit.register(shutil.rmtree, _TMPDIR, ignore_errors=True)
+
+
+def _tmp_path(suffix: str = "") -> Path:
+    return _TMPDIR / f"{next(_TMPCTR)}{suffix}"
+
+
+def _cache_key(*parts: object) -> str:
+    return hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+
+
+def _cache_path(namespace: str, key: str, suffix: str) -> Path:
+    path = _CACHE_DIR / namespace / f"{key}{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write via a temp file in `_TMPDIR` + rename so readers never see half a file."""
+    tmp_path = _tmp_path()
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def disk_memo(namespace: str):
+    """Persist the string result of an async LLM helper under ``namespace``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args):
+            path = _cache_path(namespace, _cache_key(MODEL, *args), ".txt")
+            if path.exists():
+                return path.read_text(encoding="utf-8")
+            result = await fn(*args)
+            _atomic_write(path, result.encode("utf-8"))
+            return result
+        return wrapper
+    return decorator
+
+# Opening scenes by (model + category, idea embedding): kids repeat themselves
+# a lot. Scoping by MODEL keeps a STORY_MODEL A/B run from serving old openings.
+_scene_cache = SemanticCache(_CACHE_DIR / "scene1.db")
+atexit.register(_scene_cache.save)
+
+# ---------- TTS (TEXT-TO-SPEECH) ------------------------------------------
 
 def _clean_for_tts(raw: str) -> str:
     """Remove markdown markers and numbered options; truncate at 4096 chars."""
-    no_md = re.sub(r"[*_`#🌟]", "", raw)
+    no_md = raw.translate(_TTS_DEL)
     no_opts = "\n".join(
-        ln for ln in no_md.splitlines() if not ln.strip().startswith(("1.", "2."))
+        ln for ln in no_md.splitlines() if not _OPT_RE.match(ln)
     )
     return no_opts[:4096]
 
 
-def _generate_audio(text: str) -> str:
-    """Return a base-64 data-URL (audio/mp3) for Gradio's <audio> component."""
-    clean = _clean_for_tts(text)
-    h = hashlib.md5(clean.encode()).hexdigest()
-    if h in _audio_cache:
-        return _audio_cache[h]
+def _tts_path(text: str, voice: str, speed: float) -> Path:
+    return _cache_path("tts", _cache_key(TTS_MODEL, voice, speed, text), ".mp3")
 
-    try:
-        # 1. Stream TTS to a temporary mp3 file ----------------------------
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp_path = Path(tmp.name)
-
-        with _client.audio.speech.with_streaming_response.create(
-            model=TTS_MODEL,
-            voice=DEFAULT_VOICE,  # Use default voice for the cached version
-            input=clean,
-            speed=0.9  # Slightly slower for bedtime stories
-        ) as resp:
-            resp.stream_to_file(tmp_path)
-
-        # 2. Read, encode, cache ------------------------------------------
-        mp3_bytes = tmp_path.read_bytes()
-        data_url = "data:audio/mp3;base64," + base64.b64encode(mp3_bytes).decode()
-        _audio_cache[h] = data_url
-        tmp_path.unlink(missing_ok=True)
-        return data_url
 
-    except OpenAIError as e:
-        print("[TTS] error:", e)
-        return ""  # silent failure keeps UI responsive
+async def _synthesize(text: str, voice: str, speed: float) -> Path:
+    """Return the cached mp3 for ``text`` in ``voice``, synthesising it on a miss."""
+    path = _tts_path(text, voice, speed)
+    if path.exists():
+        return path
+
+    tmp_path = _tmp_path(".mp3")
+    async with _api_slot(), _aclient.audio.speech.with_streaming_response.create(
+        model=TTS_MODEL,
+        voice=voice,
+        input=text,
+        speed=speed,
+    ) as resp:
+        await resp.stream_to_file(tmp_path)
+    os.replace(tmp_path, path)
+    return path
 
 # ---------- IMAGE GENERATION ----------------------------------------------
 
-def _generate_poster(scenes: List[str]) -> str:
-    """Return a DALL·E-3 image URL representing the whole story."""
+async def _generate_poster(scenes: List[str]) -> str:
+    """Return the path of a (cached) DALL·E-3 PNG representing the whole story."""
     story_text = " ".join(scenes)
-    story_essence = textwrap.shorten(story_text, width=200, placeholder="…")
+    # Only a short seed is needed: cut at the last word break inside 200 chars
+    if len(story_text) > 200:
+        story_essence = story_text[:197].rsplit(" ", 1)[0] + "…"
+    else:
+        story_essence = story_text
 
     prompt = (
         f"A fantasy scene with {story_essence}\n\n"
@@ -165,15 +348,22 @@ def _generate_poster(scenes: List[str]) -> str:
         "Rule: Image only. Zero text. No words. No letters. No writing. No labels. No captions. Visual only."
     )
 
-    img_resp = openai.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size="1024x1024",
-        quality="standard",
-        n=1,
-        response_format="url",
-    )
-    return img_resp.data[0].url
+    path = _cache_path("poster", _cache_key("dall-e-3", prompt), ".png")
+    if path.exists():
+        return str(path)
+
+    # b64_json ships the image in this response – no second fetch of a URL
+    async with _api_slot():
+        img_resp = await _aclient.images.generate(
+            model="dall-e-3",
+            prompt=prompt,
+            size="1024x1024",
+            quality="standard",
+            n=1,
+            response_format="b64_json",
+        )
+    _atomic_write(path, base64.b64decode(img_resp.data[0].b64_json))
+    return str(path)
 
 # ---------- LLM JUDGE MODULE ----------------------------------------------
 
@@ -203,27 +393,50 @@ End with:
 Format your response clearly with scores and explanations.
 """
 
-def judge_story(state: dict):
+# Same request also picks the Learn Something term, saving a round-trip
+JUDGE_JSON_SUFFIX = """
+Also pick ONE interesting action, object, or animal from the story that a
+7-year-old could learn about.
+
+Return JSON: {"evaluation": "<your full evaluation, in Markdown>", "learn_term": "<that single word>"}
+"""
+_JUDGE_SYSTEM = {"role": "system", "content": "You are an expert evaluator of children's bedtime stories."}
+
+@disk_memo("judge")
+async def _judge(full_story: str) -> str:
+    """Return the evaluation and a learn-something term as a JSON string."""
+    async with _api_slot():
+        response = await _aclient.chat.completions.create(
+            model=MODEL,
+            messages=[
+                _JUDGE_SYSTEM,
+                {"role": "user", "content": JUDGE_PROMPT.format(story=full_story) + JUDGE_JSON_SUFFIX}
+            ],
+            temperature=0.3,  # Lower temperature for more consistent evaluation
+            max_tokens=500,   # headroom: a truncated JSON reply is unusable
+            response_format={"type": "json_object"},
+        )
+    data = json.loads(response.choices[0].message.content)
+    # Re-dump so only well-formed results reach the disk cache
+    return json.dumps({"evaluation": data["evaluation"], "learn_term": data.get("learn_term", "")})
+
+
+async def judge_story(state: dict):
     """Evaluate the completed story using LLM judge"""
     if not state.get("scenes") or len(state["scenes"]) < 3:
         return gr.update(value="⚠️ Please complete the story first!", visible=True)
     
     # Get the full story
-    full_story = "\n\n".join(state["scenes"])
+    full_story = state["_joined"]
+    story_id = state.get("story_id")
     
     # Get judge evaluation
     try:
-        response = _client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert evaluator of children's bedtime stories."},
-                {"role": "user", "content": JUDGE_PROMPT.format(story=full_story)}
-            ],
-            temperature=0.3,  # Lower temperature for more consistent evaluation
-            max_tokens=500
-        )
-        
-        evaluation = response.choices[0].message.content.strip()
+        result = json.loads(await _judge(full_story))
+        evaluation = result["evaluation"].strip()
+        # A reset / new story during the call must not inherit this term
+        if result["learn_term"] and state.get("story_id") == story_id:
+            state["learn_term"] = result["learn_term"].strip()
         
         # Format the evaluation nicely
         formatted_eval = f"""## 📊 Story Evaluation Report
@@ -236,172 +449,285 @@ def judge_story(state: dict):
         
         return gr.update(value=formatted_eval, visible=True)
         
-    except Exception as e:
-        print(f"[Judge Error]: {e}")
+    except (OpenAIError, OSError, ValueError, KeyError, TypeError) as e:  # API / disk / malformed JSON
+        log.warning("Judge failed: %s", e)
         return gr.update(value="⚠️ Error evaluating story. Please try again.", visible=True)
 
 # ---------- LEARN SOMETHING MODULE -----------------------------------------
 
 import collections
-import string
 
-def extract_learning_term(story: str) -> str:
+def _heuristic_term(story: str) -> str | None:
     """
     Extract an educational term using smart heuristics:
     - Pick rare (interesting) terms over common ones
     - Avoid proper nouns by checking capitalization patterns
     - Filter out adverbs and past-tense verbs
-    - Use LLM fallback if needed
+    Returns ``None`` when nothing qualifies.
     """
-    # 1️⃣  Tokenise (letters/apostrophes only), keep case info
-    tokens = re.findall(r"\b[A-Za-z']{4,}\b", story)
-    lc_tokens = [t.lower() for t in tokens]
-
-    # 2️⃣  Build frequency table
-    counts = collections.Counter(lc_tokens)
-
-    # 3️⃣  Candidate filter:
-    #     - appears mostly in lower-case form (prob not a proper noun)
+    # 1️⃣  Tokenise (letters/apostrophes only) and, in the same pass, count
+    #     each lower-cased term plus how often it was capitalised
+    counts: collections.Counter[str] = collections.Counter()
+    caps_counts: collections.Counter[str] = collections.Counter()
+    for t in _TOK_RE.findall(story):
+        lc = t.lower()
+        counts[lc] += 1
+        if "A" <= t[0] <= "Z":     # _TOK_RE only matches ASCII letters
+            caps_counts[lc] += 1
+
+    # 2️⃣  Candidate filter:
+    #     - appears mostly in lower-case form (>50 % caps ⇒ likely a name)
     #     - not an adverb (-ly) or past-tense (-ed)  → kids find actions/objects easier
-    cands = []
-    for tok in set(lc_tokens):
-        if tok.endswith(("ly", "ed")):
-            continue
-        # how many times was it capitalised?
-        caps = sum(1 for t in tokens if t.lower() == tok and t[0].isupper())
-        if caps / counts[tok] > 0.5:      # >50 % caps ⇒ likely a name
-            continue
-        cands.append(tok)
+    cands = [
+        tok for tok, c in counts.items()
+        if not tok.endswith(("ly", "ed")) and caps_counts[tok] / c <= 0.5
+    ]
 
     if cands:
         # Pick the **rarest**, breaking ties by longest length
-        cands.sort(key=lambda w: (counts[w], -len(w)))
-        return cands[0]
-
-    # 4️⃣  Fallback mini-LLM: ask for ONE teachable term
-    prompt = (
-        "From the story below, name ONE interesting action, object, or animal "
-        "that a 7-year-old could learn about (just the single word, no quotes):\n"
-        f"\"\"\"\n{story[:1200]}\n\"\"\""
-    )
-    resp = _client.chat.completions.create(
-        model=MODEL,
-        temperature=0,
-        max_tokens=3,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    term = resp.choices[0].message.content.strip(string.punctuation + " ""\"'")
-    return term or "rainbow"
+        return min(cands, key=lambda w: (counts[w], -len(w)))
+    return None
 
-# Keep the old function name for compatibility
-def extract_key_noun(story: str) -> str:
-    """Wrapper for backward compatibility"""
-    return extract_learning_term(story)
 
 # Helper: Get child-friendly fact
 _FACT_PROMPT = """Explain "{term}" to a 7-year-old in **three short lines**.
 Use friendly language and finish with a question to make them curious."""
 
-def fetch_child_fact(term: str) -> str:
+@disk_memo("fact")
+async def fetch_child_fact(term: str) -> str:
     """Get a kid-friendly fact about the given term"""
     prompt = _FACT_PROMPT.format(term=term)
-    resp = _client.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.5,
-        max_tokens=120,
-    )
-    return resp.choices[0].message.content.strip()
+    async with _api_slot():
+        resp = await _aclient.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            max_tokens=120,
+        )
+    fact = (resp.choices[0].message.content or "").strip()
+    if not fact:  # refusal / empty reply – raise so nothing is cached
+        raise ValueError("empty fact reply")
+    return fact
+
+# When the heuristic finds nothing, pick the term AND explain it in one call
+_TERM_FACT_PROMPT = """From the story below, pick ONE interesting action, object, or animal
+that a 7-year-old could learn about, then explain it to them in **three short lines**.
+Use friendly language and finish with a question to make them curious.
+
+Return JSON: {{"term": "<the single word>", "fact": "<the three lines>"}}
+
+\"\"\"
+{story}
+\"\"\"
+"""
+
+@disk_memo("term_fact")
+async def _pick_and_explain(story: str) -> str:
+    """Pick a term and explain it in one request, for when `_heuristic_term` finds none."""
+    async with _api_slot():
+        resp = await _aclient.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": _TERM_FACT_PROMPT.format(story=story[:1200])}],
+            temperature=0.5,
+            max_tokens=150,
+            response_format={"type": "json_object"},
+        )
+    fact = json.loads(resp.choices[0].message.content)["fact"]
+    if not isinstance(fact, str) or not fact.strip():
+        raise ValueError("empty fact reply")
+    return fact.strip()
 
 # Callback for Learn Something button
-def learn_something(state: dict):
+async def learn_something(state: dict):
     """Extract key noun from story, get fact, and generate audio"""
     if not state.get("scenes"):
         return gr.update(visible=False)
     
     # Get the full story so far
-    story_text = "\n\n".join(state["scenes"])
-    
-    # Extract interesting noun and get fact
-    term = extract_key_noun(story_text)
-    fact = fetch_child_fact(term)
+    story_text = state["_joined"]
     
-    # Generate TTS for the fact using Mom's voice
+    # Reuse the judge's pick if the story has been judged, else extract one;
+    # without a heuristic pick, choose and explain a term in a single call
+    term = state.get("learn_term") or _heuristic_term(story_text)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp_path = tmp.name
-        
-        response = _client.audio.speech.create(
-            model=TTS_MODEL,
-            voice="shimmer",  # Mom's voice for educational content
-            input=fact,
-            speed=0.95  # Slightly slower for clarity
-        )
-        
-        with open(tmp_path, 'wb') as f:
-            for chunk in response.iter_bytes(1024):
-                f.write(chunk)
-        
-        return gr.update(value=tmp_path, visible=True)
-    except Exception as e:
-        print(f"[Learn TTS Error]: {e}")
+        if term:
+            fact = await fetch_child_fact(term)
+        else:
+            fact = await _pick_and_explain(story_text)
+
+        # Generate TTS for the fact using Mom's voice (slightly slower for clarity)
+        path = await _synthesize(fact, "shimmer", 0.95)
+        return gr.update(value=str(path), visible=True)
+    except (OpenAIError, OSError, ValueError, KeyError, TypeError) as e:  # API / disk / malformed JSON
+        log.warning("Learn-something failed: %s", e)
         return gr.update(visible=False)
 
 # ---------- UTILS ----------------------------------------------------------
 
 def _strip_early_ending(text: str, scene_no: int) -> str:
     if scene_no < 3:
-        text = re.sub(r"^\s*(The\s+end\.?)(\s*)$", "", text, flags=re.I | re.M)
+        text = _END_RE.sub("", text)
     return text
 
 
-def _extract_options(scene_text: str) -> List[str]:
-    """Return exactly two **clean** numbered options, or fall back."""
+@functools.lru_cache(maxsize=64)
+def _extract_options(scene_text: str) -> tuple[str, str]:
+    """Return exactly two **clean** numbered options, or fall back (memoised per scene)."""
     opts: List[str] = []
-    for ln in scene_text.splitlines():
-        stripped = ln.strip()
-        clean = re.sub(r"[*_`]+", "", stripped)
-        if clean.startswith("1.") or clean.startswith("2."):
+    for ln in reversed(scene_text.splitlines()):  # choices close the scene
+        clean = _STAR_RE.sub("", ln.strip())
+        if _OPT_RE.match(clean):
             opts.append(clean)
-    if len(opts) == 2:
-        return opts
-    return [
+            if len(opts) == 2:
+                return opts[1], opts[0]
+    return (
         "1. Continue bravely 🌟",
         "2. Take a quiet turn 💤",
-    ]
+    )
+
+def _scene_prompt(preamble: str, story_so_far: str, scene_no: int, last_choice: str) -> str:
+    """Per-story preamble + the per-scene suffix (never re-formatted); see SCENE_SYSTEM."""
+    return preamble + SCENE_SUFFIX.format(
+        scene_no=scene_no,
+        story_so_far=story_so_far,
+        last_choice=last_choice,
+    )
+
+
+async def _stream_scene(prompt: str, shown_before: str, n_outputs: int, state: dict):
+    """Yield ``(text_so_far, outputs)`` while a scene streams in.
+
+    ``n_outputs`` is the callback's output count (story_md … state). Choice
+    buttons are hidden until the scene is complete so nobody clicks mid-scene.
+    """
+    async for text in _chat(prompt):
+        yield text, (
+            gr.update(value=shown_before + text),
+            gr.update(visible=False),  # btn1
+            gr.update(visible=False),  # btn2
+            *(gr.update(),) * (n_outputs - 4),
+            state,
+        )
+
+# ---------- SPECULATIVE PREFETCH -------------------------------------------
+# While the child reads Scene 1/2 we already write the next scene for BOTH
+# choices – in a single JSON request – so the click only has to pick up a
+# finished result.
+
+_PREFETCH_LIMIT = 4                              # concurrent prefetches (OpenAI RPM)
+_PREFETCH_MAX = 256                              # pending stories kept (abandoned tabs)
+_prefetch: OrderedDict[str, asyncio.Task] = OrderedDict()  # id ➜ {choice: scene}
+_prefetch_sem: asyncio.Semaphore | None = None   # created lazily on Gradio's loop
+
+
+async def _write_branches(prompt: str, options: tuple[str, str]) -> dict[str, str]:
+    global _prefetch_sem
+    if _prefetch_sem is None:
+        _prefetch_sem = asyncio.Semaphore(_PREFETCH_LIMIT)
+    async with _prefetch_sem:
+        data = await _chat_json(prompt)
+    if not isinstance(data, dict):  # model ignored the requested shape
+        return {}
+    branches = {}
+    for i, opt in enumerate(options, 1):
+        scene = data.get(f"choice{i}")
+        if isinstance(scene, str):
+            branches[opt] = scene
+    return branches
+
+
+def _start_prefetch(state: dict, options: tuple[str, str]) -> None:
+    """Kick off the next scene for both options; must run on the event loop."""
+    _drop_prefetch(state)
+    opt1, opt2 = options
+    prompt = _scene_prompt(
+        state["preamble"], state["_joined"], state["scene_no"] + 1,
+        "choice1 / choice2 (see below)",
+    )
+    prompt += BRANCHES_SUFFIX.format(opt1=opt1, opt2=opt2)
+    key = uuid.uuid4().hex
+    _prefetch[key] = asyncio.create_task(_write_branches(prompt, options))
+    state["prefetch"] = key
+    # Sessions closed mid-story never collect their scenes – cap the registry.
+    while len(_prefetch) > _PREFETCH_MAX:
+        _prefetch.popitem(last=False)[1].cancel()
+
+
+def _drop_prefetch(state: dict) -> None:
+    """Forget and cancel this story's pending scenes."""
+    key = state.pop("prefetch", None)
+    task = _prefetch.pop(key, None) if key else None
+    if task is not None:
+        task.cancel()
+
+_background: set[asyncio.Task] = set()  # keeps fire-and-forget tasks alive
+
+
+def _spawn(coro) -> None:
+    """Run *coro* in the background; must be called on the event loop."""
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _cache_scene(scope: str, idea: str, idea_vec, scene1: str, embed: bool) -> None:
+    if embed:
+        idea_vec = await _embed(idea)
+    await asyncio.to_thread(_scene_cache.put, scope, idea, idea_vec, scene1)  # SQLite commit
 
 # ---------- STATE STRUCTURE ------------------------------------------------
-# state = {scene_no:int, scenes:List[str], idea:str, category:str}
+# state = {scene_no:int, scenes:List[str], idea:str, category:str,
+#          story_id:uuid hex, prefetch:id into _prefetch, learn_term:str,
+#          preamble:SCENE_PREAMBLE for this idea/category, _joined:scenes joined,
+#          display:story as shown, incl. the child's choices}
 
 # ---------- CALLBACKS ------------------------------------------------------
 
-def start_story(idea: str, category: str, state: dict):
+async def start_story(idea: str, category: str, fresh: bool, state: dict):
     idea = idea.strip()
     if not idea:
-        return (
+        yield (
             gr.update(value="🌜 *Please type a story idea first!*"),
             *(gr.update(visible=False),) * 11,
             gr.update(value="", visible=False),  # judge_output - clear
             gr.update(visible=False),  # learn_audio - hide
             state,
         )
-
-    scene1 = _chat(
-        SCENE_TEMPLATE.format(
-            scene_no=1,
-            story_so_far="",
-            last_choice="N/A",
-            idea=idea,
-            category=category,
-        )
-    )
-    scene1 = _strip_early_ending(scene1, 1)
-
+        return
+
+    preamble = SCENE_PREAMBLE.format(category=category, idea=idea)
+    scope = f"{MODEL}\x1f{category}"
+    # Exact repeats ("a dragon" again) hit without paying for an embedding;
+    # "fresh" skips the lookup but still stores the new scene for next time.
+    scene1 = idea_vec = None
+    if not fresh:
+        scene1 = _scene_cache.get(scope, idea)
+        if scene1 is None:
+            idea_vec = await _embed(idea)
+            # The cosine scan over every entry is CPU work – keep it off the loop
+            scene1 = await asyncio.to_thread(_scene_cache.get, scope, idea, idea_vec)
+    if scene1 is None:
+        scene1 = ""
+        async for scene1, outputs in _stream_scene(
+            _scene_prompt(preamble, "", 1, "N/A"), "", 15, state
+        ):
+            yield outputs
+        scene1 = _strip_early_ending(scene1.strip(), 1)
+        # Stored off the request path so the buttons aren't held up by an
+        # embedding call. Only "fresh" still needs one – after a failed
+        # lookup embed the entry is kept for exact-text matches instead.
+        _spawn(_cache_scene(scope, idea, idea_vec, scene1, embed=fresh))
+
+    _drop_prefetch(state)
     state.clear()
-    state.update({"scene_no": 1, "scenes": [scene1], "idea": idea, "category": category})
+    state.update({
+        "scene_no": 1, "scenes": [scene1], "idea": idea, "category": category,
+        "story_id": uuid.uuid4().hex, "preamble": preamble, "_joined": scene1, "display": scene1,
+    })
 
     opt1, opt2 = _extract_options(scene1)
-    return (
+    _start_prefetch(state, (opt1, opt2))
+    yield (
         gr.update(value=scene1),
         gr.update(value=opt1, visible=True),
         gr.update(value=opt2, visible=True),
@@ -420,27 +746,40 @@ def start_story(idea: str, category: str, state: dict):
     )
 
 
-def choose(option_text: str, state: dict):
+async def choose(option_text: str, state: dict):
     scene_no = state["scene_no"] + 1
-    combined_story = state["scenes"][-1] + f"\n\n🎲 **You chose:** {option_text}\n\n"
-
-    new_scene = _chat(
-        SCENE_TEMPLATE.format(
-            scene_no=scene_no,
-            story_so_far="\n\n".join(state["scenes"]),
-            last_choice=option_text,
-            idea=state["idea"],
-            category=state["category"],
-        )
-    )
-    new_scene = _strip_early_ending(new_scene, scene_no)
+    shown_before = state["display"] + f"\n\n🎲 **You chose:** {option_text}\n\n"
+
+    # Use the speculatively written scene if it is ready; drop the sibling.
+    # An unfinished one (possibly still queued behind other stories) would
+    # show nothing until its whole JSON reply lands, so stream instead.
+    task = _prefetch.pop(state.pop("prefetch", None), None)
+    new_scene = None
+    if task is not None and not task.done():
+        task.cancel()
+    elif task is not None:
+        try:
+            new_scene = task.result().get(option_text)
+        except Exception as e:  # speculative – any failure is just a miss
+            log.warning("Prefetch failed, streaming instead: %s", e)
+    if not new_scene:
+        new_scene = ""
+        async for new_scene, outputs in _stream_scene(
+            _scene_prompt(state["preamble"], state["_joined"], scene_no, option_text),
+            shown_before, 13, state,
+        ):
+            yield outputs
+    new_scene = _strip_early_ending(new_scene.strip(), scene_no)
     state["scenes"].append(new_scene)
+    state["_joined"] += "\n\n" + new_scene
+    state["display"] = shown_before + new_scene
     state["scene_no"] = scene_no
 
     if scene_no < 3:
         opt1, opt2 = _extract_options(new_scene)
-        display = "\n\n".join(state["scenes"])
-        return (
+        _start_prefetch(state, (opt1, opt2))
+        display = state["display"]
+        yield (
             gr.update(value=display),
             gr.update(value=opt1, visible=True),
             gr.update(value=opt2, visible=True),
@@ -456,8 +795,8 @@ def choose(option_text: str, state: dict):
             state,
         )
     else:
-        ending = "\n\n".join(state["scenes"]) + "\n\n🌟 **The End!** 🌟"
-        return (
+        ending = state["display"] + "\n\n🌟 **The End!** 🌟"
+        yield (
             gr.update(value=ending),
             *(gr.update(visible=False),) * 2,     # choice buttons
             gr.update(visible=False),              # feedback box
@@ -473,26 +812,39 @@ def choose(option_text: str, state: dict):
         )
 
 
-def apply_feedback(feedback: str, state: dict):
+async def apply_feedback(feedback: str, state: dict):
     feedback = feedback.strip()
     if not feedback:
-        return gr.update(value="⚠️ Please type feedback."), *(gr.update(visible=False),) * 10, gr.update(visible=False), state
+        yield gr.update(value="⚠️ Please type feedback."), *(gr.update(visible=False),) * 10, gr.update(visible=False), state
+        return
 
     idx = state["scene_no"] - 1
-    revised = _chat(
+    old_scene = state["scenes"][idx]
+    # The scene being revised is always the last one; swap just the tail
+    shown_before = state["display"][: len(state["display"]) - len(old_scene)]
+    revised = ""
+    async for revised, outputs in _stream_scene(
         REVISION_TEMPLATE.format(
             scene_no=state["scene_no"],
             feedback=feedback,
-            original_scene=state["scenes"][idx],
-        )
-    )
-    revised = _strip_early_ending(revised, state["scene_no"])
+            original_scene=old_scene,
+        ),
+        shown_before,
+        13,
+        state,
+    ):
+        yield outputs
+    revised = _strip_early_ending(revised.strip(), state["scene_no"])
     state["scenes"][idx] = revised
+    state["_joined"] = state["_joined"][: len(state["_joined"]) - len(old_scene)] + revised
+    state["display"] = shown_before + revised
+    state.pop("learn_term", None)  # picked from the old text
 
-    display = "\n\n".join(state["scenes"])
+    display = state["display"]
     if state["scene_no"] < 3:
         opt1, opt2 = _extract_options(revised)
-        return (
+        _start_prefetch(state, (opt1, opt2))
+        yield (
             gr.update(value=display),
             gr.update(value=opt1, visible=True),
             gr.update(value=opt2, visible=True),
@@ -509,7 +861,7 @@ def apply_feedback(feedback: str, state: dict):
         )
     else:
         ending = display + "\n\n🌟 **The End!** 🌟"
-        return (
+        yield (
             gr.update(value=ending),
             *(gr.update(visible=False),) * 2,
             gr.update(visible=False),
@@ -525,14 +877,18 @@ def apply_feedback(feedback: str, state: dict):
         )
 
 
-def generate_poster_clicked(state: dict):
+async def generate_poster_clicked(state: dict):
     if state.get("scenes") and len(state["scenes"]) >= 3:
-        poster_url = _generate_poster(state["scenes"])
-        return gr.update(value=poster_url, visible=True), gr.update(visible=False)
+        try:
+            poster_path = await _generate_poster(state["scenes"])
+        except (OpenAIError, OSError) as e:  # API / writing the image file
+            log.warning("Poster failed: %s", e)
+            return gr.update(visible=False), gr.update(visible=True)
+        return gr.update(value=poster_path, visible=True), gr.update(visible=False)
     return gr.update(visible=False), gr.update(visible=True)
 
 
-def narrate_scene(voice_choice: str, state: dict):
+async def narrate_scene(voice_choice: str, state: dict):
     if state.get("scenes") and state.get("scene_no", 0) > 0:
         latest_scene = state["scenes"][-1]
         
@@ -552,31 +908,44 @@ def narrate_scene(voice_choice: str, state: dict):
         speed = voice_speeds.get(selected_voice, 0.9)
         
         try:
-            # Generate speech and save to temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-                tmp_path = tmp.name
-            
-            response = _client.audio.speech.create(
-                model=TTS_MODEL,
-                voice=selected_voice,
-                input=clean_text,
-                speed=speed
-            )
-            
-            # Write response content to file
-            with open(tmp_path, 'wb') as f:
-                for chunk in response.iter_bytes(1024):
-                    f.write(chunk)
-            
-            # Return file path instead of data URL
-            return gr.update(value=tmp_path, visible=True)
-        except Exception as e:
-            print(f"[TTS] Error: {e}")
+            # Generate speech (or reuse the cached mp3) and return its path
+            path = await _synthesize(clean_text, selected_voice, speed)
+            return gr.update(value=str(path), visible=True)
+        except (OpenAIError, OSError) as e:  # API / writing the audio file
+            log.warning("Narration failed: %s", e)
             return gr.update(visible=False)
     return gr.update(visible=False)
 
 
-def reset(state: dict):
+async def finish_story(voice_choice: str, state: dict):
+    """End of Scene 3: fetch poster, judge report and narration concurrently."""
+    if state.get("scene_no") != 3:
+        return (*(gr.update(),) * 4, state)
+    story_id = state.get("story_id")
+    poster, report, narration = await asyncio.gather(
+        generate_poster_clicked(state),
+        judge_story(state),
+        narrate_scene(voice_choice, state),
+        return_exceptions=True,
+    )
+    if state.get("story_id") != story_id:  # reset / new story meanwhile
+        return (*(gr.update(),) * 4, state)
+
+    for what, result in (("Poster", poster), ("Judge", report), ("Narration", narration)):
+        if isinstance(result, Exception):
+            log.warning("%s failed: %s", what, result)
+    if isinstance(poster, Exception):
+        poster = (gr.update(visible=False), gr.update(visible=True))
+    if isinstance(report, Exception):
+        report = gr.update(value="⚠️ Error evaluating story. Please try again.", visible=True)
+    if isinstance(narration, Exception):
+        narration = gr.update(visible=False)
+    return (*poster, report, narration, state)
+
+
+async def reset(state: dict):
+    """Async so `_drop_prefetch` cancels loop-owned tasks on the event loop."""
+    _drop_prefetch(state)
     state.clear()
     return (
         gr.update(value=""),                    # story text
@@ -601,193 +970,224 @@ CUSTOM_CSS = """
 """
 
 # ---------- UI -------------------------------------------------------------
-with gr.Blocks(title="🌙 Interactive Bedtime Stories", css=CUSTOM_CSS) as demo:
-    gr.Markdown(
-        "## 🌙 **Interactive Bedtime Stories**\n"
-        "Describe an adventure, pick a category, then guide the tale – and see a poster of your story!"
-    )
+def build_demo() -> gr.Blocks:
+    """Build the Blocks UI; kept out of import so `import app` stays light."""
+    with gr.Blocks(title="🌙 Interactive Bedtime Stories", css=CUSTOM_CSS) as demo:
+        gr.Markdown(
+            "## 🌙 **Interactive Bedtime Stories**\n"
+            "Describe an adventure, pick a category, then guide the tale – and see a poster of your story!"
+        )
 
-    state = gr.State({})
+        state = gr.State({})
 
-    with gr.Row():
-        idea_box = gr.Textbox(
-            label="✨ Your story idea",
-            placeholder="e.g. A friendly dragon who loves cookies…",
-            lines=1,
-        )
-        cat_menu = gr.Dropdown(choices=CATEGORIES, value=DEFAULT_CATEGORY, label="📚 Category")
-        start_btn = gr.Button("🚀 Start Story", variant="primary")
+        with gr.Row():
+            idea_box = gr.Textbox(
+                label="✨ Your story idea",
+                placeholder="e.g. A friendly dragon who loves cookies…",
+                lines=1,
+            )
+            cat_menu = gr.Dropdown(choices=CATEGORIES, value=DEFAULT_CATEGORY, label="📚 Category")
+            start_btn = gr.Button("🚀 Start Story", variant="primary")
+        fresh_chk = gr.Checkbox(label="🎲 Always write a brand-new story (skip remembered openings)", value=False)
 
-    story_md = gr.Markdown(elem_classes="story-text")
+        story_md = gr.Markdown(elem_classes="story-text")
 
-    with gr.Row():
-        btn1 = gr.Button(elem_classes="choice-btn", visible=False)
-        btn2 = gr.Button(elem_classes="choice-btn", visible=False)
+        with gr.Row():
+            btn1 = gr.Button(elem_classes="choice-btn", visible=False)
+            btn2 = gr.Button(elem_classes="choice-btn", visible=False)
 
-    fb_box = gr.Textbox(label="📝 Request a change", lines=1, visible=False)
-    fb_btn = gr.Button("🔄 Apply Feedback", visible=False)
+        fb_box = gr.Textbox(label="📝 Request a change", lines=1, visible=False)
+        fb_btn = gr.Button("🔄 Apply Feedback", visible=False)
 
-    poster_img = gr.Image(label="🎨 Story Poster", visible=False)
-    poster_btn = gr.Button("🎨 Display Poster", variant="primary", visible=False)
+        poster_img = gr.Image(label="🎨 Story Poster", type="filepath", visible=False)
+        poster_btn = gr.Button("🎨 Display Poster", variant="primary", visible=False)
 
-    with gr.Row():
-        voice_dropdown = gr.Dropdown(
-            choices=[(label, voice) for voice, label in VOICE_OPTIONS.items()],
-            value=DEFAULT_VOICE,
-            label="Choose Narrator",
-            visible=False,
-            scale=1
+        with gr.Row():
+            voice_dropdown = gr.Dropdown(
+                choices=[(label, voice) for voice, label in VOICE_OPTIONS.items()],
+                value=DEFAULT_VOICE,
+                label="Choose Narrator",
+                visible=False,
+                scale=1
+            )
+            narrate_btn = gr.Button("🔊 Listen to Scene", variant="secondary", visible=False, scale=2)
+
+        audio_player = gr.Audio(label="Story Narration", type="filepath", visible=False, autoplay=True)
+
+        # Learn Something feature
+        with gr.Row():
+            learn_btn = gr.Button("🐾 Learn Something", variant="secondary", visible=False)
+            learn_audio = gr.Audio(label="Fun Fact", type="filepath", visible=False, autoplay=True)
+
+        # Judge feature
+        judge_btn = gr.Button("⚖️ Judge Story", variant="secondary", visible=False)
+        judge_output = gr.Markdown(visible=False)
+
+        reset_btn = gr.Button("🔄 New Story", visible=False)
+
+        # ---------- Wiring ----------
+        start_btn.click(
+            start_story,
+            inputs=[idea_box, cat_menu, fresh_chk, state],
+            outputs=[
+                story_md,
+                btn1,
+                btn2,
+                fb_box,
+                fb_btn,
+                poster_img,
+                poster_btn,
+                voice_dropdown,
+                narrate_btn,
+                audio_player,
+                learn_btn,
+                judge_btn,
+                judge_output,
+                learn_audio,
+                state,
+            ],
         )
-        narrate_btn = gr.Button("🔊 Listen to Scene", variant="secondary", visible=False, scale=2)
-    
-    audio_player = gr.Audio(label="Story Narration", visible=False, autoplay=True)
-    
-    # Learn Something feature
-    with gr.Row():
-        learn_btn = gr.Button("🐾 Learn Something", variant="secondary", visible=False)
-        learn_audio = gr.Audio(label="Fun Fact", visible=False, autoplay=True)
-    
-    # Judge feature
-    judge_btn = gr.Button("⚖️ Judge Story", variant="secondary", visible=False)
-    judge_output = gr.Markdown(visible=False)
-
-    reset_btn = gr.Button("🔄 New Story", visible=False)
-
-    # ---------- Wiring ----------
-    start_btn.click(
-        start_story,
-        inputs=[idea_box, cat_menu, state],
-        outputs=[
-            story_md,
-            btn1,
-            btn2,
-            fb_box,
-            fb_btn,
-            poster_img,
-            poster_btn,
-            voice_dropdown,
-            narrate_btn,
-            audio_player,
-            learn_btn,
-            judge_btn,
-            judge_output,
-            state,
-        ],
-    )
 
-    btn1.click(
-        choose,
-        inputs=[btn1, state],
-        outputs=[
-            story_md,
-            btn1,
-            btn2,
-            fb_box,
-            fb_btn,
-            poster_img,
-            poster_btn,
-            voice_dropdown,
-            narrate_btn,
-            audio_player,
-            learn_btn,
-            judge_btn,
-            state,
-        ],
-    )
-    btn2.click(
-        choose,
-        inputs=[btn2, state],
-        outputs=[
-            story_md,
-            btn1,
-            btn2,
-            fb_box,
-            fb_btn,
-            poster_img,
-            poster_btn,
-            voice_dropdown,
-            narrate_btn,
-            audio_player,
-            learn_btn,
-            judge_btn,
-            state,
-        ],
-    )
+        btn1.click(
+            choose,
+            inputs=[btn1, state],
+            outputs=[
+                story_md,
+                btn1,
+                btn2,
+                fb_box,
+                fb_btn,
+                poster_img,
+                poster_btn,
+                voice_dropdown,
+                narrate_btn,
+                audio_player,
+                learn_btn,
+                judge_btn,
+                state,
+            ],
+        ).then(
+            finish_story,
+            inputs=[voice_dropdown, state],
+            outputs=[poster_img, poster_btn, judge_output, audio_player, state],
+            concurrency_limit=4,  # includes a DALL·E-3 call
+        )
+        btn2.click(
+            choose,
+            inputs=[btn2, state],
+            outputs=[
+                story_md,
+                btn1,
+                btn2,
+                fb_box,
+                fb_btn,
+                poster_img,
+                poster_btn,
+                voice_dropdown,
+                narrate_btn,
+                audio_player,
+                learn_btn,
+                judge_btn,
+                state,
+            ],
+        ).then(
+            finish_story,
+            inputs=[voice_dropdown, state],
+            outputs=[poster_img, poster_btn, judge_output, audio_player, state],
+            concurrency_limit=4,  # includes a DALL·E-3 call
+        )
 
-    fb_btn.click(
-        apply_feedback,
-        inputs=[fb_box, state],
-        outputs=[
-            story_md,
-            btn1,
-            btn2,
-            fb_box,
-            fb_btn,
-            poster_img,
-            poster_btn,
-            voice_dropdown,
-            narrate_btn,
-            audio_player,
-            learn_btn,
-            judge_btn,
-            state,
-        ],
-    )
+        fb_btn.click(
+            apply_feedback,
+            inputs=[fb_box, state],
+            outputs=[
+                story_md,
+                btn1,
+                btn2,
+                fb_box,
+                fb_btn,
+                poster_img,
+                poster_btn,
+                voice_dropdown,
+                narrate_btn,
+                audio_player,
+                learn_btn,
+                judge_btn,
+                state,
+            ],
+        )
 
-    poster_btn.click(
-        generate_poster_clicked,
-        inputs=[state],
-        outputs=[poster_img, poster_btn],
-    )
+        poster_btn.click(
+            generate_poster_clicked,
+            inputs=[state],
+            outputs=[poster_img, poster_btn],
+            concurrency_limit=4,  # DALL·E-3 is slow and tightly rate-limited
+        )
 
-    narrate_btn.click(
-        narrate_scene,
-        inputs=[voice_dropdown, state],
-        outputs=[audio_player],
-    )
-    
-    learn_btn.click(
-        learn_something,
-        inputs=[state],
-        outputs=[learn_audio],
-    )
-    
-    judge_btn.click(
-        judge_story,
-        inputs=[state],
-        outputs=[judge_output],
-    )
+        narrate_btn.click(
+            narrate_scene,
+            inputs=[voice_dropdown, state],
+            outputs=[audio_player],
+        )
 
-    reset_btn.click(
-        reset,
-        inputs=[state],
-        outputs=[
-            story_md,
-            btn1,
-            btn2,
-            fb_box,
-            fb_btn,
-            poster_img,
-            poster_btn,
-            voice_dropdown,
-            narrate_btn,
-            audio_player,
-            learn_btn,
-            judge_btn,
-            judge_output,
-            state,
-        ],
-    )
+        learn_btn.click(
+            learn_something,
+            inputs=[state],
+            outputs=[learn_audio],
+        )
 
-    story_md.change(
-        lambda x: gr.update(visible=bool(x)),
-        inputs=[story_md],
-        outputs=[reset_btn],
-    )
+        judge_btn.click(
+            judge_story,
+            inputs=[state],
+            outputs=[judge_output],
+        )
+
+        reset_btn.click(
+            reset,
+            inputs=[state],
+            outputs=[
+                story_md,
+                btn1,
+                btn2,
+                fb_box,
+                fb_btn,
+                poster_img,
+                poster_btn,
+                voice_dropdown,
+                narrate_btn,
+                audio_player,
+                learn_btn,
+                judge_btn,
+                judge_output,
+                state,
+            ],
+        )
+
+        story_md.change(
+            lambda x: gr.update(visible=bool(x)),
+            inputs=[story_md],
+            outputs=[reset_btn],
+        )
+
+        # Runs on the server's event loop, so the warmed connection is the one
+        # the callbacks will reuse.
+        demo.load(_warm_up, queue=False)
+
+    return demo
 
 # --------------------------------------------------------------------------
 if __name__ == "__main__":
     if not os.getenv("OPENAI_API_KEY"):
         raise RuntimeError("OPENAI_API_KEY not set")
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+        format="[%(name)s] %(levelname)s: %(message)s",
+    )
 
-    demo.launch()
+    demo = build_demo()
+    # Handlers spend nearly all their time waiting on OpenAI, so let several
+    # sessions' events (and one user's poster/judge/narrate clicks) overlap.
+    demo.queue(default_concurrency_limit=8, max_size=QUEUE_MAX_SIZE)
+    # Cached audio/posters live outside cwd. Serve only those two folders –
+    # scene1.db and the text caches hold other users' stories.
+    demo.launch(allowed_paths=[str(_CACHE_DIR / "tts"), str(_CACHE_DIR / "poster")])
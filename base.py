@@ -1,29 +1,41 @@
-import openai
+from typing import Iterator
+
+from openai import OpenAI
 
 """
 Before submitting the assignment, describe here in a few sentences what you would have built next if you spent 2 more hours on this project:
 
 """
 
-def call_model(prompt: str, max_tokens=3000, temperature=0.1) -> str:
-   
-    resp = openai.ChatCompletion.create(
+_client = OpenAI()  # uses OPENAI_API_KEY env-var
+
+
+def stream_model(prompt: str, max_tokens=1200, temperature=0.1) -> Iterator[str]:
+    """Yield the reply piece by piece as the model writes it."""
+    stream = _client.chat.completions.create(
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": prompt}],
-        stream=False,
+        stream=True,
         max_tokens=max_tokens,
         temperature=temperature,
     )
-    return resp.choices[0].message["content"]  # type: ignore
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def call_model(prompt: str, max_tokens=1200, temperature=0.1) -> str:
+    return "".join(stream_model(prompt, max_tokens, temperature))
 
 example_requests = "A story about a girl named Alice and her best friend Bob, who happens to be a cat."
 
 
 def main():
     user_input = input("What kind of story do you want to hear? ")
-    response = call_model(user_input)
-    print(response)
+    for piece in stream_model(user_input):  # print as it arrives, not after 10-20 s
+        print(piece, end="", flush=True)
+    print()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,171 @@
+"""
+cache.py – tiny semantic cache for repeated story ideas
+------------------------------------------------------
+Children ask for the same things again and again ("a brave kitten",
+"brave kitten story"). `SemanticCache` remembers a generated result
+under the embedding of the prompt that produced it, so near-duplicate
+prompts can skip the LLM entirely.
+
+Usage
+-----
+
+from cache import SemanticCache
+
+cache = SemanticCache(Path("~/.cache/bedtime/scene1.db").expanduser())
+hit = cache.get("Fantasy & Magic", "a brave kitten", vector)
+if hit is None:
+    cache.put("Fantasy & Magic", "a brave kitten", vector, scene_text)
+
+Vectors are plain lists of floats (any length, e.g. 256-d OpenAI
+embeddings); a `None` vector falls back to exact-text matching.
+Entries are written through to a small SQLite file as they are added,
+so they survive restarts – even ones that never reach `save()`. Hits only
+update recency in memory; it is persisted by the next `put()` or `save()`,
+so a lookup never touches the disk. All methods are thread-safe, so callers
+on an event loop can run them with `asyncio.to_thread`.
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from typing import Optional, Sequence
+
+
+def _normalise(vector: Sequence[float]) -> list[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class SemanticCache:
+    """
+    LRU map of (scope, prompt) ➜ result, matched by cosine similarity.
+
+    Parameters
+    ----------
+    path : Path | None
+        SQLite file backing the cache. ``None`` keeps it in memory only.
+    max_entries : int
+        Least-recently-used entries beyond this are evicted.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        # (scope, normalised text) ➜ {"vec": [...] | None, "value": str}
+        self._entries: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._clock = count()  # recency stamp persisted in the `used` column
+        self._touched: dict[tuple[str, str], int] = {}  # hits not yet persisted
+        self._lock = threading.Lock()
+        if path is None:
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " scope TEXT, text TEXT, vec BLOB, value TEXT, used INTEGER,"
+                " PRIMARY KEY (scope, text))"
+            )
+            rows = self._db.execute(
+                "SELECT scope, text, vec, value, used FROM entries ORDER BY used"
+            ).fetchall()
+        except sqlite3.DatabaseError:  # corrupt file – run in memory only
+            self._db.close()
+            self._db = None
+            return
+        for scope, text, vec, value, _ in rows:
+            self._entries[(scope, text)] = {
+                "vec": array("d", vec).tolist() if vec is not None else None,
+                "value": value,
+            }
+        if rows:
+            self._clock = count(rows[-1][4] + 1)
+
+    @staticmethod
+    def _key(scope: str, text: str) -> tuple[str, str]:
+        return scope, " ".join(text.lower().split())
+
+    def get(
+        self,
+        scope: str,
+        text: str,
+        vector: Optional[Sequence[float]] = None,
+        threshold: float = 0.92,
+    ) -> Optional[str]:
+        """Return the cached value for an identical or similar prompt, if any."""
+        key = self._key(scope, text)
+        query = _normalise(vector) if vector is not None else None
+        with self._lock:
+            best_key = key if key in self._entries else None
+
+            if best_key is None and query is not None:
+                best_sim = threshold
+                for k, entry in self._entries.items():
+                    if k[0] != scope or entry["vec"] is None:
+                        continue
+                    sim = _dot(query, entry["vec"])
+                    if sim >= best_sim:
+                        best_key, best_sim = k, sim
+
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self._touched[best_key] = next(self._clock)
+            return self._entries[best_key]["value"]
+
+    def put(
+        self,
+        scope: str,
+        text: str,
+        vector: Optional[Sequence[float]],
+        value: str,
+    ) -> None:
+        key = self._key(scope, text)
+        vec = _normalise(vector) if vector is not None else None
+        with self._lock:
+            self._entries[key] = {"vec": vec, "value": value}
+            self._entries.move_to_end(key)
+            self._touched.pop(key, None)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self._touched.pop(evicted[-1], None)
+
+            if self._db is not None:
+                with self._db:  # one transaction per put, with pending hits
+                    self._flush_touched()
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                        (*key, array("d", vec).tobytes() if vec is not None else None,
+                         value, next(self._clock)),
+                    )
+                    self._db.executemany(
+                        "DELETE FROM entries WHERE scope = ? AND text = ?", evicted
+                    )
+
+    def _flush_touched(self) -> None:
+        """Write pending hit stamps; caller holds the lock and a transaction."""
+        self._db.executemany(
+            "UPDATE entries SET used = ? WHERE scope = ? AND text = ?",
+            [(used, *k) for k, used in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def save(self) -> None:
+        """Persist recency from hits since the last put; entries are already on disk."""
+        with self._lock:
+            if self._db is not None and self._touched:
+                with self._db:
+                    self._flush_touched()
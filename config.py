@@ -1,7 +1,22 @@
 """
 Configuration settings for the bedtime story generator.
+
+The large, rarely used tables (EVALUATION_CRITERIA, STORY_STRUCTURES,
+VOCABULARY_GUIDELINES, GENERATION_PARAMS) live in config_data.json and are
+loaded on first access, so importing MODELS or a prompt stays cheap.
+EVALUATION_CRITERIA_ORDER / EVALUATION_WEIGHTS are derived from them then.
 """
 
+import json
+import sys
+from pathlib import Path
+from types import MappingProxyType
+
+try:
+    import orjson  # optional: faster parse of config_data.json
+except ImportError:
+    orjson = None
+
 # API Model Configurations
 MODELS = {
     "v1": {
@@ -15,6 +30,8 @@ MODELS = {
         "temperature": 0.7,
     }
 }
+# Read-only views: callers can share them without defensive copies
+MODELS = MappingProxyType({k: MappingProxyType(v) for k, v in MODELS.items()})
 
 # System Prompts
 
@@ -74,157 +91,36 @@ Focus on:
 Your revised story should be a complete, standalone story incorporating all improvements.
 """
 
-# Evaluation Criteria Parameters
-EVALUATION_CRITERIA = {
-    "age_appropriateness": {
-        "weight": 0.25,
-        "description": "Vocabulary, themes, and content suitable for ages 5-10"
-    },
-    "engagement": {
-        "weight": 0.25,
-        "description": "Story is captivating and interesting for children"
-    },
-    "structure": {
-        "weight": 0.15,
-        "description": "Clear beginning, middle, and end with logical flow"
-    },
-    "educational_value": {
-        "weight": 0.15,
-        "description": "Contains positive lessons or educational elements"
-    },
-    "clarity": {
-        "weight": 0.20,
-        "description": "Easy to follow and understand for the target age group"
-    }
-}
-
-# Story Structure Templates
-STORY_STRUCTURES = {
-    "hero_journey": {
-        "description": "A character faces a challenge, goes on an adventure, and returns transformed",
-        "elements": [
-            "Introduction of main character and setting",
-            "Call to adventure or problem to solve",
-            "Challenges and obstacles",
-            "Climax where character faces biggest challenge",
-            "Resolution and return with new knowledge"
-        ]
-    },
-    "problem_solution": {
-        "description": "A character encounters a problem and finds a creative solution",
-        "elements": [
-            "Introduction of character and everyday setting",
-            "Problem arises that disrupts normal life",
-            "Character tries various approaches to solve problem",
-            "Character has insight or receives help",
-            "Problem is resolved and lesson is learned"
-        ]
-    },
-    "friendship_tale": {
-        "description": "Characters learn about friendship, cooperation, or kindness",
-        "elements": [
-            "Introduction of characters who are different from each other",
-            "Situation that brings characters together",
-            "Conflict or misunderstanding between characters",
-            "Resolution through communication or cooperation",
-            "Strengthened friendship and lesson about relationships"
-        ]
-    },
-    # New template: Mystery/Discovery
-    "mystery_discovery": {
-        "description": "Characters discover something mysterious and learn through exploration",
-        "elements": [
-            "Introduction of curious characters in familiar setting",
-            "Discovery of something unusual or mysterious",
-            "Investigation and gathering clues or information",
-            "Moment of realization or understanding",
-            "Sharing of knowledge and reflection on what was learned"
-        ]
-    },
-    # New template: Personal Growth
-    "personal_growth": {
-        "description": "A character learns to overcome a personal limitation or fear",
-        "elements": [
-            "Introduction of character with a specific limitation, fear, or insecurity",
-            "Situation that forces character to confront their limitation",
-            "Initial struggle or failure when attempting to overcome the challenge",
-            "Moment of self-discovery or new perspective",
-            "Success in overcoming limitation and reflection on personal growth"
-        ]
-    },
-    # New template: Fantasy Adventure
-    "fantasy_adventure": {
-        "description": "Characters journey through a magical world with fantastical elements",
-        "elements": [
-            "Introduction of ordinary characters and the magical element/world",
-            "Entry into the fantasy world or acquisition of magical ability",
-            "Exploration and wonder at the magical elements",
-            "Challenge that requires both magical and non-magical solutions",
-            "Resolution and return to normal life with new appreciation"
-        ]
-    },
-    # New template: Nature Connection
-    "nature_connection": {
-        "description": "Characters connect with nature and learn about the environment",
-        "elements": [
-            "Introduction of characters and natural setting",
-            "Encounter with an animal, plant, or natural phenomenon",
-            "Learning experience about how nature works",
-            "Challenge related to preserving or understanding nature",
-            "Resolution that emphasizes harmony with the natural world"
-        ]
-    }
-}
-
-# Age-Appropriate Vocabulary Guidelines
-VOCABULARY_GUIDELINES = {
-    "5-7": {
-        "sentence_length": "5-8 words on average",
-        "paragraph_length": "2-3 sentences",
-        "words_to_use": [
-            "big", "small", "happy", "sad", "friend", "help", "play", "share",
-            "kind", "brave", "love", "family", "fun", "learn", "grow"
-        ],
-        "words_to_avoid": [
-            "complex", "sophisticated", "extraordinary", "melancholy", "intricate",
-            "convoluted", "exacerbate", "facilitate", "preliminary", "substantial"
-        ]
-    },
-    "8-10": {
-        "sentence_length": "8-12 words on average",
-        "paragraph_length": "3-5 sentences",
-        "words_to_use": [
-            "adventure", "discover", "curious", "imagine", "wonder", "create",
-            "challenge", "solve", "explore", "journey", "mystery", "courage", "teamwork"
-        ],
-        "words_to_avoid": [
-            "existential", "philosophical", "inconsequential", "unprecedented",
-            "unequivocally", "disenfranchised", "disillusionment", "quintessential"
-        ]
-    }
-}
-
-# Default Generation Parameters
-GENERATION_PARAMS = {
-    "storyteller": {
-        "temperature": 0.7,
-        "max_tokens": 2500,
-        "top_p": 1.0,
-        "frequency_penalty": 0.5,
-        "presence_penalty": 0.3
-    },
-    "judge": {
-        "temperature": 0.4,
-        "max_tokens": 1500,
-        "top_p": 1.0,
-        "frequency_penalty": 0.2,
-        "presence_penalty": 0.2
-    },
-    "revision": {
-        "temperature": 0.6,
-        "max_tokens": 2500,
-        "top_p": 1.0,
-        "frequency_penalty": 0.5,
-        "presence_penalty": 0.3
-    }
-}
\ No newline at end of file
+# ---------- Lazily loaded tables (PEP 562) ----------
+_DATA_PATH = Path(__file__).with_name("config_data.json")
+_LAZY_NAMES = frozenset({
+    "EVALUATION_CRITERIA", "STORY_STRUCTURES", "VOCABULARY_GUIDELINES", "GENERATION_PARAMS",
+    "EVALUATION_CRITERIA_ORDER", "EVALUATION_WEIGHTS",
+})
+
+
+def __getattr__(name: str):
+    """Parse the sidecar on first use; later lookups hit module globals directly."""
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    raw = _DATA_PATH.read_bytes()
+    data = orjson.loads(raw) if orjson else json.loads(raw)
+    # Word lists become frozensets of interned strings: O(1) membership checks
+    # for vocabulary validators, and one shared object per word.
+    for band in data["VOCABULARY_GUIDELINES"].values():
+        for field in ("words_to_use", "words_to_avoid"):
+            band[field] = frozenset(map(sys.intern, band[field]))
+    data["GENERATION_PARAMS"] = MappingProxyType(
+        {k: MappingProxyType(v) for k, v in data["GENERATION_PARAMS"].items()}
+    )
+    # Parallel tuples so a weighted score is one pass, not a dict walk:
+    # sum(map(operator.mul, EVALUATION_WEIGHTS, (scores[k] for k in ORDER)))
+    criteria = data["EVALUATION_CRITERIA"]
+    data["EVALUATION_CRITERIA_ORDER"] = tuple(criteria)
+    data["EVALUATION_WEIGHTS"] = tuple(c["weight"] for c in criteria.values())
+    globals().update((key, data[key]) for key in _LAZY_NAMES)
+    return data[name]
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_NAMES})
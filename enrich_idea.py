@@ -6,18 +6,94 @@ Usage
 
 from enrich_idea import generate_enriched_idea
 
-rich_idea = generate_enriched_idea("mom")
+rich_idea = generate_enriched_idea("mom and the talking animals")
 # ➜ "A courageous mom who discovers she can talk to animals
 #    and sets off on a jungle adventure with her kids."
 
+Single-word character ideas ("mom", "dog") are filled into a local
+template instead of calling the API; other single words go to the model.
+
 Feed `rich_idea` into your story prompt as the {idea} placeholder.
+`generate_enriched_ideas([...])` does a whole batch concurrently.
+
+Results are also kept on disk under $BEDTIME_CACHE_DIR/enrich (shared
+with app.py), so re-runs skip the API; set ENRICH_CACHE_DISABLE=1 to
+always call it.
 """
 
+import atexit
+import hashlib
+import logging
 import os
-import openai
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
 
 # Feel free to change the default model
-_MODEL = "gpt-3.5-turbo"  # Changed to match the base.py model
+_MODEL = os.getenv("STORY_MODEL", "gpt-4o-mini")  # same default as app.py
+
+log = logging.getLogger(__name__)
+
+_CACHE_DIR = Path(os.getenv("BEDTIME_CACHE_DIR", "~/.cache/bedtime")).expanduser() / "enrich"
+_CACHE_OFF = os.getenv("ENRICH_CACHE_DISABLE") == "1"
+
+_PROMPT = """
+You are a children's creative-writing assistant.
+The child's idea is: "{idea}"
+
+Expand it into ONE or TWO sentences that:
+• keep the core topic intact,
+• add colourful, child-friendly details (who, where, why),
+• remain suitable for a 5-10-year-old,
+• end with a period.
+
+Return ONLY the enriched idea – no bullet points, prefixes, or quotes.
+"""
+_FALLBACK = "A magical adventure about {idea} that teaches children about friendship and courage."
+
+# Single-character seeds ("mom", "dog") get the same boilerplate from the LLM
+# anyway – fill one of these locally and skip the round-trip. Only nouns that
+# read right as "A brave {w} who…"; "space" or "dragons" go to the model.
+_CHARACTER_NOUNS = frozenset({
+    "mom", "dad", "grandma", "grandpa", "sister", "brother", "baby", "girl", "boy",
+    "princess", "prince", "king", "queen", "knight", "pirate", "wizard", "witch",
+    "fairy", "mermaid", "astronaut", "robot", "dragon", "unicorn", "dinosaur",
+    "monster", "giant", "elf", "dog", "puppy", "cat", "kitten", "bunny", "rabbit",
+    "bear", "fox", "owl", "mouse", "lion", "tiger", "elephant", "monkey", "penguin",
+    "turtle", "frog", "duck", "horse", "pony", "squirrel", "dolphin", "whale",
+})
+_ONE_WORD_TEMPLATES = (
+    "A brave {w} who discovers a secret world full of wonder and kindness.",
+    "A curious {w} who sets off on a gentle adventure and learns about friendship.",
+    "A cheerful {w} who solves a puzzling mystery with a little help from new friends.",
+    "A tiny {w} with a big dream who finds the courage to make it come true.",
+)
+
+
+@lru_cache(maxsize=1)
+def _get_client():
+    """One pooled client (HTTP session + TLS) for every enrichment call.
+
+    The SDK is imported here so importing this module (or a cache hit)
+    never pays for it; the client reads OPENAI_API_KEY once. Its keep-alive
+    pool (HTTP/2 when `h2` is installed) is shared by the SDK's retries too.
+    """
+    import openai
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    # The SDK's own httpx client keeps its default pool limits and timeouts
+    http_client = openai.DefaultHttpxClient(http2=http2)
+    atexit.register(http_client.close)
+    # The SDK already backs off (with jitter) on connection errors, 429s and
+    # 5xx, and fails fast on auth errors; give blips one more try than default.
+    return openai.OpenAI(http_client=http_client, max_retries=3)
 
 
 def generate_enriched_idea(raw_idea: str, *, model: str | None = None) -> str:
@@ -40,31 +116,84 @@ def generate_enriched_idea(raw_idea: str, *, model: str | None = None) -> str:
     raw_idea = raw_idea.strip()
     if not raw_idea:
         raise ValueError("The idea cannot be empty.")
+    word = raw_idea.lower()
+    if word in _CHARACTER_NOUNS:  # one known character, e.g. "Dog"
+        return random.choice(_ONE_WORD_TEMPLATES).format(w=word)
 
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    chosen_model = model or _MODEL
+    try:
+        return _cached_enrich(raw_idea, model or _MODEL)
+    except Exception as e:
+        # Return a simple enriched version as fallback (never cached)
+        log.warning("Enrichment failed, using fallback: %s", e)
+        return _FALLBACK.format(idea=raw_idea)
 
-    prompt = f"""
-You are a children's creative-writing assistant.
-The child's idea is: "{raw_idea}"
 
-Expand it into ONE or TWO sentences that:
-• keep the core topic intact,
-• add colourful, child-friendly details (who, where, why),
-• remain suitable for a 5-10-year-old,
-• end with a period.
+def generate_enriched_ideas(
+    raw_ideas: list[str], *, model: str | None = None, max_workers: int = 8
+) -> list[str]:
+    """
+    Enrich several ideas at once; total latency ≈ the slowest single call.
 
-Return ONLY the enriched idea – no bullet points, prefixes, or quotes.
-"""
+    Duplicates are requested once and cached ideas return without a call.
+    Results come back in input order; an empty idea raises ``ValueError``
+    just like `generate_enriched_idea`.
+    """
+    unique = list(dict.fromkeys(raw_ideas))
+    if not unique:
+        return []
+    enrich = partial(generate_enriched_idea, model=model)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+        results = dict(zip(unique, pool.map(enrich, unique)))
+    return [results[idea] for idea in raw_ideas]
 
-    try:
-        response = openai.chat.completions.create(
-            model=chosen_model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-        )
 
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        # Return a simple enriched version as fallback
-        return f"A magical adventure about {raw_idea} that teaches children about friendship and courage."
+_MEMO_MAX = 1024
+_memo: OrderedDict[tuple[str, str], str] = OrderedDict()  # (norm idea, model) ➜ result
+_memo_lock = threading.Lock()  # generate_enriched_ideas calls in from threads
+
+
+def _cached_enrich(raw_idea: str, model: str) -> str:
+    """One API call per (normalised idea, model); errors propagate uncached.
+
+    The lowercased, whitespace-collapsed idea is only the cache key – the
+    model still sees ``raw_idea`` as typed. ``_memo.clear()`` starts fresh.
+    """
+    norm_idea = " ".join(raw_idea.lower().split())
+    memo_key = (norm_idea, model)
+    with _memo_lock:
+        if memo_key in _memo:
+            _memo.move_to_end(memo_key)
+            return _memo[memo_key]
+
+    key = hashlib.blake2b(f"{model}\x1f{norm_idea}".encode(), digest_size=16).hexdigest()
+    path = _CACHE_DIR / f"{key}.txt"
+    if not _CACHE_OFF and path.exists():
+        return _remember(memo_key, path.read_text(encoding="utf-8"))
+
+    response = _get_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": _PROMPT.format(idea=raw_idea)}],
+        temperature=0.5,
+        max_tokens=100,  # one or two sentences ≈ 40–70 tokens
+    )
+    result = response.choices[0].message.content.strip()
+
+    if not _CACHE_OFF:
+        # Temp file + rename so a concurrent reader never sees half a file
+        try:
+            _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{key}.{os.getpid()}.tmp")
+            tmp.write_text(result, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass  # read-only/full disk: still return the fresh result
+    return _remember(memo_key, result)
+
+
+def _remember(memo_key: tuple[str, str], result: str) -> str:
+    with _memo_lock:
+        _memo[memo_key] = result
+        _memo.move_to_end(memo_key)
+        while len(_memo) > _MEMO_MAX:
+            _memo.popitem(last=False)
+    return result